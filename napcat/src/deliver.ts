@@ -30,22 +30,40 @@ function inferMediaType(url: string): "image" | "video" | "file" {
   return "file";
 }
 
-async function sendNapcatMessage(opts: {
+async function sendNapcatMessages(opts: {
   client: NapcatRpcClient;
   account: ResolvedNapcatAccount;
   target: NapcatTarget;
-  segments: NapcatSegment[];
+  messages: NapcatSegment[][];
   timeoutMs?: number;
 }): Promise<void> {
-  if (opts.segments.length === 0) return;
-  await opts.client.request("send", {
-    channel: opts.target.channel,
-    group_id: opts.target.channel === "group" ? opts.target.id : undefined,
-    user_id: opts.target.channel === "private" ? opts.target.id : undefined,
-    message: opts.segments,
-    napcat_url: opts.account.napcatUrl,
-    timeout: opts.timeoutMs,
-  });
+  const messages = opts.messages.filter((segments) => segments.length > 0);
+  if (messages.length === 0) return;
+  // One RPC per reply; nap-msg sends the messages in order, waiting for each reply before the next,
+  // so the RPC deadline covers every message (plus slack for the connection) rather than just one.
+  const perMessageMs = opts.timeoutMs ?? 10_000;
+  const results = await opts.client.request<Array<{ error?: { message?: string } }>>(
+    "send.batch",
+    {
+      requests: messages.map((segments) => ({
+        channel: opts.target.channel,
+        group_id: opts.target.channel === "group" ? opts.target.id : undefined,
+        user_id: opts.target.channel === "private" ? opts.target.id : undefined,
+        message: segments,
+      })),
+      napcat_url: opts.account.napcatUrl,
+      // nap-msg takes its per-message Napcat timeout in seconds.
+      timeout: opts.timeoutMs ? opts.timeoutMs / 1000 : undefined,
+    },
+    { timeoutMs: perMessageMs > 0 ? perMessageMs * messages.length + 2_000 : 0 },
+  );
+  // Timeouts and Napcat rejections come back as error items too; nap-msg stops the batch at the first one.
+  const failed = results.findIndex((result) => result?.error);
+  if (failed !== -1) {
+    throw new Error(
+      `napcat send failed after ${failed}/${messages.length} messages: ${results[failed].error?.message ?? "unknown error"}`,
+    );
+  }
 }
 
 export async function deliverNapcatReplies(params: DeliverNapcatParams): Promise<void> {
@@ -73,6 +91,7 @@ export async function deliverNapcatReplies(params: DeliverNapcatParams): Promise
       chunkMode,
     );
     let includeReply = Boolean(reply.replyToId);
+    const messages: NapcatSegment[][] = [];
 
     if (mediaList.length === 0) {
       for (const chunk of chunks.length > 0 ? chunks : [""]) {
@@ -84,37 +103,32 @@ export async function deliverNapcatReplies(params: DeliverNapcatParams): Promise
         if (chunk.trim()) {
           segments.push({ type: "text", data: { text: chunk } });
         }
-        await sendNapcatMessage({
-          client,
-          account,
-          target,
-          segments,
-          timeoutMs: account.timeoutMs,
-        });
-      }
-      continue;
-    }
-
-    let first = true;
-    for (const url of mediaList) {
-      const segments: NapcatSegment[] = [];
-      if (includeReply && reply.replyToId) {
-        segments.push({ type: "reply", data: { id: reply.replyToId } });
-        includeReply = false;
+        messages.push(segments);
       }
-      if (first && convertedText.trim()) {
-        segments.push({ type: "text", data: { text: convertedText } });
+    } else {
+      let first = true;
+      for (const url of mediaList) {
+        const segments: NapcatSegment[] = [];
+        if (includeReply && reply.replyToId) {
+          segments.push({ type: "reply", data: { id: reply.replyToId } });
+          includeReply = false;
+        }
+        if (first && convertedText.trim()) {
+          segments.push({ type: "text", data: { text: convertedText } });
+        }
+        first = false;
+        const mediaType = inferMediaType(url);
+        segments.push({ type: mediaType, data: { file: url } });
+        messages.push(segments);
       }
-      first = false;
-      const mediaType = inferMediaType(url);
-      segments.push({ type: mediaType, data: { file: url } });
-      await sendNapcatMessage({
-        client,
-        account,
-        target,
-        segments,
-        timeoutMs: account.timeoutMs,
-      });
     }
+
+    await sendNapcatMessages({
+      client,
+      account,
+      target,
+      messages,
+      timeoutMs: account.timeoutMs,
+    });
   }
 }
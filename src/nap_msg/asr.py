@@ -1,15 +1,21 @@
-import base64
+import functools
 import hashlib
 import hmac
-import json
 import os
 import time
 from datetime import datetime
 from typing import Optional
 
-import httpx
 import logging
 
+try:
+    from pybase64 import b64encode
+except ImportError:  # optional SIMD encoder; stdlib is the fallback
+    from base64 import b64encode
+
+from . import codec
+from .http_pool import shared_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -69,6 +75,22 @@ def _build_tc3_headers(body: bytes, timestamp: int, secret_id: str, secret_key:
     return headers
 
 
+@functools.lru_cache(maxsize=1)
+def _tencent_settings() -> tuple[str, str, Optional[str], str]:
+    """(secret_id, secret_key, region, engine), read once on first use so a loaded .env is seen."""
+    return (
+        os.getenv("TENCENT_SECRET_ID", "").strip(),
+        os.getenv("TENCENT_SECRET_KEY", "").strip(),
+        os.getenv("TENCENT_ASR_REGION", "").strip() or None,
+        os.getenv("TENCENT_ASR_ENGINE", "16k_zh").strip(),
+    )
+
+
+def credentials_configured() -> bool:
+    secret_id, secret_key, _, _ = _tencent_settings()
+    return bool(secret_id and secret_key)
+
+
 async def sentence_recognize(
     data: bytes,
     voice_format: str = "mp3",
@@ -78,35 +100,32 @@ async def sentence_recognize(
     if not data:
         raise ValueError("Audio data is empty")
 
-    secret_id = os.getenv("TENCENT_SECRET_ID", "").strip()
-    secret_key = os.getenv("TENCENT_SECRET_KEY", "").strip()
+    secret_id, secret_key, region, default_engine = _tencent_settings()
     if not secret_id or not secret_key:
         raise RuntimeError("Missing Tencent Cloud credentials: set TENCENT_SECRET_ID and TENCENT_SECRET_KEY")
 
-    region = os.getenv("TENCENT_ASR_REGION", "").strip() or None
-    engine = eng_service_type or os.getenv("TENCENT_ASR_ENGINE", "16k_zh").strip()
+    engine = eng_service_type or default_engine
 
     payload = {
         "SubServiceType": 2,
         "EngSerViceType": engine,
         "SourceType": 1,
         "VoiceFormat": voice_format,
-        "Data": base64.b64encode(data).decode("utf-8"),
+        "Data": b64encode(data).decode("ascii"),
     }
     if project_id is not None:
         payload["ProjectId"] = project_id
 
-    body = json.dumps(payload).encode("utf-8")
+    body = codec.dumps_bytes(payload)
     ts = int(time.time())
     headers = _build_tc3_headers(body, ts, secret_id, secret_key, region)
 
     url = "https://asr.tencentcloudapi.com"
     logger.info("Calling Tencent Cloud sentence recognition")
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(url, content=body, headers=headers)
-        resp.raise_for_status()
-        result = resp.json()
+    resp = await shared_client().post(url, content=body, headers=headers, timeout=30.0)
+    resp.raise_for_status()
+    result = resp.json()
 
     response = result.get("Response") if isinstance(result, dict) else None
     if not response:
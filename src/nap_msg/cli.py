@@ -2,53 +2,56 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import json
+import functools
 import logging
 import os
+import re
 import sys
 from pathlib import Path
 from typing import List
 
+from . import codec
 from .client import DEFAULT_TIMEOUT, NapcatRelayClient, send_group_forward_message, send_group_message, send_private_message
 from .messages import FileMessage, ForwardNode, ImageMessage, ReplyMessage, TextMessage, VideoMessage
-from .rpc import run_rpc_server
+from .rpc import run_rpc_server, write_stdout
 
 
-def _segment_action(segment_type: str):
-    """Create an argparse action that appends (type, value) while preserving CLI order."""
+# KEY=value per line, optional "export ", values optionally wrapped in matching quotes.
+_DOTENV_RE = re.compile(
+    r"""^[ \t]*(?:export[ \t]+)?([^#=\s][^=\n]*?)[ \t]*=[ \t]*(?:"(.*)"|'(.*)'|([^\n]*?))[ \t]*\r?$""",
+    re.M,
+)
 
-    class _SegmentAction(argparse.Action):
-        def __call__(self, parser, namespace, values, option_string=None):
-            segments = getattr(namespace, self.dest, []) or []
-            segments.append((segment_type, values))
-            setattr(namespace, self.dest, segments)
+_SEGMENT_BUILDERS = {
+    "reply": ReplyMessage,
+    "text": TextMessage,
+    "image": ImageMessage,
+    "video": VideoMessage,
+    "file": FileMessage,
+}
 
-    return _SegmentAction
+
+class _SegmentAction(argparse.Action):
+    """Append (builder, value) for the segment type in `const`, preserving CLI order."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        segments = getattr(namespace, self.dest, []) or []
+        segments.append((_SEGMENT_BUILDERS[self.const], values))
+        setattr(namespace, self.dest, segments)
 
 
 def _load_dotenv_if_present() -> None:
     env_path = Path.cwd() / ".env"
-    if not env_path.is_file():
-        return
     try:
-        for line in env_path.read_text(encoding="utf-8").splitlines():
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#"):
-                continue
-            if stripped.startswith("export "):
-                stripped = stripped[len("export ") :].strip()
-            if "=" not in stripped:
-                continue
-            key, _, value = stripped.partition("=")
-            key = key.strip()
-            if not key or key in os.environ:
-                continue
-            value = value.strip()
-            if (value.startswith('"') and value.endswith('"')) or (value.startswith("'") and value.endswith("'")):
-                value = value[1:-1]
-            os.environ[key] = value
+        if not env_path.is_file() or not env_path.stat().st_size:
+            return
+        content = env_path.read_text(encoding="utf-8")
     except OSError as exc:
         logging.debug("Skipping .env load: %s", exc)
+        return
+    for match in _DOTENV_RE.finditer(content):
+        # Exactly one of the quoted/unquoted value groups participates; lastindex points at it.
+        os.environ.setdefault(match.group(1), match.group(match.lastindex))
 
 
 def _configure_logging(verbose: bool) -> None:
@@ -60,19 +63,40 @@ def _configure_logging(verbose: bool) -> None:
 
     handlers = [file_handler]
     if verbose:
-        handlers.append(logging.StreamHandler())
+        # stdout carries JSON (responses, RPC frames); console logs must never share it.
+        handlers.append(logging.StreamHandler(sys.stderr))
 
     logging.basicConfig(level=level, format=fmt, handlers=handlers, force=True)
 
 
+# Fast-path option tables; must stay in sync with _build_parser/_add_segment_args.
+_FAST_GLOBAL_OPTIONS = {"--napcat-url": "napcat_url", "--timeout": "timeout"}
+_FAST_SEGMENT_OPTIONS = {
+    "-t": "text",
+    "--text": "text",
+    "-i": "image",
+    "--image": "image",
+    "-f": "file",
+    "--file": "file",
+    "-v": "video",
+    "--video": "video",
+    "-r": "reply",
+    "--reply": "reply",
+}
+_FAST_SEND_POSITIONALS = {"send": "user_id", "send-group": "group_id"}
+_FAST_SEND_GROUP_OPTIONS = {"--type": "type"}
+_FAST_RPC_OPTIONS = {"--napcat-url": "rpc_napcat_url", "--timeout": "rpc_timeout", "--protocol": "protocol"}
+
+
 def _add_segment_args(parser: argparse.ArgumentParser) -> None:
-    parser.add_argument("-t", "--text", dest="segments", action=_segment_action("text"), help="Text segment")
-    parser.add_argument("-i", "--image", dest="segments", action=_segment_action("image"), help="Image file path or URL")
-    parser.add_argument("-f", "--file", dest="segments", action=_segment_action("file"), help="File path to upload")
-    parser.add_argument("-v", "--video", dest="segments", action=_segment_action("video"), help="Video file path or URL")
-    parser.add_argument("-r", "--reply", dest="segments", action=_segment_action("reply"), help="Reply to a message id")
+    parser.add_argument("-t", "--text", dest="segments", action=_SegmentAction, const="text", help="Text segment")
+    parser.add_argument("-i", "--image", dest="segments", action=_SegmentAction, const="image", help="Image file path or URL")
+    parser.add_argument("-f", "--file", dest="segments", action=_SegmentAction, const="file", help="File path to upload")
+    parser.add_argument("-v", "--video", dest="segments", action=_SegmentAction, const="video", help="Video file path or URL")
+    parser.add_argument("-r", "--reply", dest="segments", action=_SegmentAction, const="reply", help="Reply to a message id")
 
 
+@functools.lru_cache(maxsize=1)
 def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="nap-msg",
@@ -80,7 +104,7 @@ def _build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--napcat-url",
-        default=os.getenv("NAPCAT_URL"),
+        default=None,
         help="Napcat WebSocket endpoint (env NAPCAT_URL).",
     )
     parser.add_argument(
@@ -129,31 +153,38 @@ def _build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Response wait timeout in seconds for RPC mode.",
     )
+    rpc.add_argument(
+        "--protocol",
+        choices=["json", "msgpack"],
+        default="json",
+        help="Framing on stdin/stdout: JSON lines or length-prefixed msgpack (needs msgspec).",
+    )
 
     return parser
 
 
 def _build_message_segments(args: argparse.Namespace) -> List[object]:
     segments = getattr(args, "segments", []) or []
-    parts: List[object] = []
-    builders = {
-        "reply": ReplyMessage,
-        "text": TextMessage,
-        "image": ImageMessage,
-        "video": VideoMessage,
-        "file": FileMessage,
-    }
-    for seg_type, value in segments:
-        builder = builders.get(seg_type)
-        if builder:
-            parts.append(builder(value))
-    return parts
+    return [builder(value) for builder, value in segments]
+
+
+@functools.lru_cache(maxsize=1)
+def _forward_identity() -> tuple[str, str]:
+    # Read on first use, after main() has loaded .env.
+    return os.getenv("NAPCAT_FORWARD_USER_ID", ""), os.getenv("NAPCAT_FORWARD_NICKNAME", "メイド")
 
 
 def _build_forward_nodes(parts: List[object]) -> List[ForwardNode]:
-    user_id = os.getenv("NAPCAT_FORWARD_USER_ID", "")
-    nickname = os.getenv("NAPCAT_FORWARD_NICKNAME", "メイド")
-    return [ForwardNode(user_id, nickname, [part]) for part in parts]
+    user_id, nickname = _forward_identity()
+    # Serialize each distinct part once; nodes repeating a part share its dict, for this send only.
+    serialized: dict[int, dict] = {}
+    nodes = []
+    for part in parts:
+        payload = serialized.get(id(part))
+        if payload is None:
+            payload = serialized[id(part)] = part.as_dict()
+        nodes.append(ForwardNode(user_id, nickname, [payload]))
+    return nodes
 
 
 def _serialize_parts(parts: List[object]) -> List[dict]:
@@ -161,9 +192,9 @@ def _serialize_parts(parts: List[object]) -> List[dict]:
 
 
 def _print_response(response: dict) -> None:
-    sys.stdout.write(json.dumps(response, ensure_ascii=False, indent=2))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
+    # Pretty-print for people at a terminal; scripts reading a pipe get compact JSON.
+    data = codec.dumps_bytes(response, indent=sys.stdout.isatty())
+    write_stdout(data + b"\n")
 
 
 def _message_parts_or_error(args: argparse.Namespace) -> List[object] | None:
@@ -213,10 +244,93 @@ def _run_send_private(args: argparse.Namespace) -> int:
     return 0
 
 
+def _fast_parse(argv: List[str]) -> argparse.Namespace | None:
+    """
+    Parse the common send/send-group/rpc shapes without building argparse.
+    Returns None for anything unusual (help, --opt=value, unknown flags, bad values) so argparse handles it.
+    """
+    namespace = argparse.Namespace(napcat_url=None, timeout=None, verbose=False)
+    index = 0
+    while index < len(argv) and argv[index].startswith("-"):
+        option = argv[index]
+        if option == "--verbose":
+            namespace.verbose = True
+            index += 1
+            continue
+        dest = _FAST_GLOBAL_OPTIONS.get(option)
+        if dest is None or index + 1 >= len(argv) or argv[index + 1].startswith("-"):
+            return None
+        setattr(namespace, dest, argv[index + 1])
+        index += 2
+    if index >= len(argv):
+        return None
+
+    command = argv[index]
+    namespace.command = command
+    if command == "rpc":
+        options = _FAST_RPC_OPTIONS
+        namespace.rpc_napcat_url = None
+        namespace.rpc_timeout = None
+        namespace.protocol = "json"
+    elif command in _FAST_SEND_POSITIONALS:
+        options = _FAST_SEND_GROUP_OPTIONS if command == "send-group" else {}
+        namespace.segments = None
+        if command == "send-group":
+            namespace.type = "normal"
+            namespace.forward = False
+    else:
+        return None
+
+    positionals: List[str] = []
+    rest = argv[index + 1 :]
+    index = 0
+    while index < len(rest):
+        arg = rest[index]
+        if not arg.startswith("-"):
+            positionals.append(arg)
+            index += 1
+            continue
+        if arg == "--forward" and command == "send-group":
+            namespace.forward = True
+            index += 1
+            continue
+        if index + 1 >= len(rest) or rest[index + 1].startswith("-"):
+            return None
+        value = rest[index + 1]
+        segment_type = _FAST_SEGMENT_OPTIONS.get(arg) if command != "rpc" else None
+        if segment_type:
+            if namespace.segments is None:
+                namespace.segments = []
+            namespace.segments.append((_SEGMENT_BUILDERS[segment_type], value))
+        elif arg in options:
+            setattr(namespace, options[arg], value)
+        else:
+            return None
+        index += 2
+
+    if command == "rpc":
+        if positionals or namespace.protocol not in ("json", "msgpack"):
+            return None
+    else:
+        if len(positionals) != 1:
+            return None
+        setattr(namespace, _FAST_SEND_POSITIONALS[command], positionals[0])
+        if command == "send-group" and namespace.type not in ("normal", "forward"):
+            return None
+
+    try:
+        for dest in ("timeout", "rpc_timeout"):
+            value = getattr(namespace, dest, None)
+            if value is not None:
+                setattr(namespace, dest, float(value))
+    except ValueError:
+        return None
+    return namespace
+
+
 def main(argv: list[str] | None = None) -> int:
     _load_dotenv_if_present()
-    parser = _build_parser()
-    args = parser.parse_args(argv)
+    args = _fast_parse(sys.argv[1:] if argv is None else list(argv)) or _build_parser().parse_args(argv)
     _configure_logging(args.verbose)
 
     if args.command == "send":
@@ -227,9 +341,10 @@ def main(argv: list[str] | None = None) -> int:
         return run_rpc_server(
             default_url=getattr(args, "rpc_napcat_url", None) or args.napcat_url,
             default_timeout=getattr(args, "rpc_timeout", None) or args.timeout,
+            protocol=args.protocol,
         )
 
-    parser.error(f"Unknown command {args.command}")
+    _build_parser().error(f"Unknown command {args.command}")
     return 2
 
 
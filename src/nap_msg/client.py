@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import os
 from typing import Any, Dict, List, Optional
 
-import websockets
+from websockets.exceptions import ConnectionClosedOK
 
+from . import codec
 from .messages import Command, CommandType, ForwardNode
+from .ws_compat import connect as _ws_connect, recv_raw as _recv_raw
 
 logger = logging.getLogger(__name__)
 
@@ -16,46 +17,170 @@ DEFAULT_TIMEOUT = 10.0
 
 
 class NapcatRelayClient:
-    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None):
+    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None, persistent: bool = False):
         self.url = url or _env_url()
         self.timeout = timeout or _parse_timeout(os.getenv("NAPCAT_TIMEOUT", ""))
+        self._persistent = persistent
+        self._ws = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        """Keep one websocket open; later commands are queued onto it and re-dialed if it drops."""
+        self._persistent = True
+        async with self._connect_lock:
+            if self._ws is not None:
+                return
+            logger.debug("Opening persistent Napcat websocket url=%s", self.url)
+            ws = await _ws_connect(self.url, max_size=None)
+            self._ws = ws
+            self._outbox = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer(ws, self._outbox))
+            self._reader_task = asyncio.create_task(self._reader(ws))
+
+    async def close(self) -> None:
+        self._persistent = False
+        ws = self._ws
+        if ws is None:
+            return
+        tasks = [task for task in (self._writer_task, self._reader_task) if task]
+        self._detach(ws, ConnectionError("Napcat connection closed"))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await ws.close()
 
     async def send_command(self, command: Command) -> Dict[str, Any]:
-        payload = json.dumps(command.as_dict(), ensure_ascii=False)
+        if self._persistent:
+            return await self._request(command)
+
+        payload = codec.dumps(command.as_dict())
         logger.debug("Connecting to Napcat websocket url=%s action=%s", self.url, command.action.value)
-        async with websockets.connect(self.url, max_size=None) as ws:
+        async with _ws_connect(self.url, max_size=None) as ws:
             await ws.send(payload)
             logger.debug("Sent command echo=%s action=%s", command.echo, command.action.value)
             try:
-                return await self._wait_for_response(ws, command.echo)
-            except asyncio.TimeoutError:
-                logger.warning("Napcat response timed out after %.1fs", self.timeout)
-                return {"status": "timeout", "echo": command.echo}
+                return await self._reply_or_timeout(ws, command.echo)
             except Exception as exc:  # noqa: BLE001
                 logger.exception("Napcat websocket error echo=%s: %s", command.echo, exc)
                 raise
 
-    async def _wait_for_response(self, ws, echo: str) -> Dict[str, Any]:
-        """Skip non-command frames (e.g., lifecycle meta_events) until matching echo arrives."""
+    async def send_batch(self, commands: List[Command]) -> List[Dict[str, Any]]:
+        """
+        Send commands over one connection strictly in order, each after the previous reply, so
+        multi-part replies reach QQ in sequence. Returns one entry per command: its Napcat reply,
+        or {"error": {...}} if it failed or was not sent because an earlier command failed.
+        """
+        if not commands:
+            return []
+        if self._persistent:
+            return await _send_in_order(commands, self._request)
+
+        logger.debug("Connecting to Napcat websocket url=%s batch=%d", self.url, len(commands))
+        async with _ws_connect(self.url, max_size=None) as ws:
+
+            async def send_one(command: Command) -> Dict[str, Any]:
+                await ws.send(codec.dumps(command.as_dict()))
+                logger.debug("Sent command echo=%s action=%s", command.echo, command.action.value)
+                return await self._reply_or_timeout(ws, command.echo)
+
+            return await _send_in_order(commands, send_one)
+
+    async def _request(self, command: Command) -> Dict[str, Any]:
+        """Queue command on the persistent connection and wait for the reply with its echo."""
+        await self.connect()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[command.echo] = future
+        self._outbox.put_nowait((command.echo, codec.dumps(command.as_dict())))
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Napcat response timed out after %.1fs", self.timeout)
+            return {"status": "timeout", "echo": command.echo}
+        finally:
+            self._pending.pop(command.echo, None)
+
+    async def _writer(self, ws, outbox: asyncio.Queue) -> None:
+        """Single writer for the persistent connection, so callers never wait on ws.send()."""
         while True:
-            raw = await asyncio.wait_for(ws.recv(), timeout=self.timeout)
-            logger.debug("Received frame bytes=%d", len(raw))
+            echo, payload = await outbox.get()
             try:
-                data = json.loads(raw)
-            except Exception:
-                logger.debug("Ignoring non-JSON frame")
-                continue
+                await ws.send(payload)
+                logger.debug("Sent command echo=%s", echo)
+            except Exception as exc:  # noqa: BLE001
+                future = self._pending.get(echo)
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+                self._detach(ws, exc)
+                return
 
-            if data.get("post_type") == "meta_event":
-                logger.debug("Ignoring meta_event frame")
-                continue
+    async def _reader(self, ws) -> None:
+        """Resolve pending commands by echo; other frames (events, meta_events) are dropped."""
+        try:
+            while True:
+                raw = await _recv_raw(ws)
+                # Pushed events/meta_events carry no echo; drop them (or anything while idle) undecoded.
+                if not self._pending or not codec.has_echo_key(raw):
+                    continue
+                data = _decode_reply(raw)
+                if data is None:
+                    continue
+                future = self._pending.get(data.get("echo"))
+                if future is not None and not future.done():
+                    future.set_result(data)
+        except asyncio.CancelledError:
+            raise
+        except ConnectionClosedOK:
+            pass
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Napcat connection lost: %s", exc)
+        self._detach(ws, ConnectionError("Napcat connection closed"))
 
-            if data.get("echo") and data.get("echo") != echo:
+    def _detach(self, ws, exc: BaseException) -> None:
+        """Forget a dead connection and fail its in-flight commands; the next command re-dials."""
+        if self._ws is not ws:
+            return
+        self._ws = None
+        self._outbox = None
+        current = asyncio.current_task()
+        for task in (self._writer_task, self._reader_task):
+            if task and task is not current:
+                task.cancel()
+        self._writer_task = None
+        self._reader_task = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def _reply_or_timeout(self, ws, echo: str) -> Dict[str, Any]:
+        """Wait for the reply under one deadline; pushed events and heartbeats must not keep extending it."""
+        try:
+            return await asyncio.wait_for(self._wait_for_response(ws, echo), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Napcat response timed out after %.1fs", self.timeout)
+            return {"status": "timeout", "echo": echo}
+
+    async def _wait_for_response(self, ws, echo: str) -> Dict[str, Any]:
+        """Skip frames that are not our reply (meta_events, pushed events, other echoes)."""
+        while True:
+            data = await self._next_reply(ws)
+            if data.get("echo") != echo:
                 logger.debug("Ignoring frame with mismatched echo=%s", data.get("echo"))
                 continue
 
             return data
 
+    async def _next_reply(self, ws) -> Dict[str, Any]:
+        """Return the next decoded frame that is not a meta_event."""
+        while True:
+            raw = await _recv_raw(ws)
+            data = _decode_reply(raw)
+            if data is not None:
+                return data
+
 
 async def send_group_message(
     client: NapcatRelayClient, group_id: str, message: List[Dict[str, Any]]
@@ -81,6 +206,73 @@ async def send_private_message(
     return await client.send_command(command)
 
 
+async def _send_in_order(commands: List[Command], send_one) -> List[Dict[str, Any]]:
+    """
+    Await each send before the next. The first command that raises, times out or is rejected by
+    Napcat stops the batch: a late reply could otherwise land after the next message. It and every
+    later command are reported as {"error": ...}.
+    """
+    results: List[Dict[str, Any]] = []
+    for index, command in enumerate(commands):
+        try:
+            reply = await send_one(command)
+        except Exception as exc:  # noqa: BLE001
+            error = _batch_error(str(exc))
+        else:
+            failure = _reply_failure(reply)
+            if failure is None:
+                results.append(reply)
+                continue
+            error = _batch_error(failure, reply)
+        logger.warning(
+            "Napcat batch stopped at command %d/%d: %s", index + 1, len(commands), error["error"]["message"]
+        )
+        results.append(error)
+        results.extend(
+            _batch_error("Not sent: an earlier message in the batch failed") for _ in commands[index + 1 :]
+        )
+        break
+    return results
+
+
+def _reply_failure(reply: Dict[str, Any]) -> Optional[str]:
+    """Why a Napcat reply counts as a failed send, or None. retcode 1 is OneBot's accepted-async."""
+    status = reply.get("status")
+    if status == "timeout":
+        return "Napcat response timed out"
+    retcode = reply.get("retcode")
+    if status == "failed" or retcode not in (None, 0, 1):
+        return reply.get("wording") or reply.get("message") or f"Napcat returned status={status} retcode={retcode}"
+    return None
+
+
+def _batch_error(message: str, reply: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    error: Dict[str, Any] = {"code": -32000, "message": message}
+    if reply is not None:
+        error["data"] = reply
+    return {"error": error}
+
+
+def _decode_reply(raw: str | bytes) -> Optional[Dict[str, Any]]:
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received frame bytes=%d", len(raw))
+    try:
+        data = codec.loads(raw)
+    except Exception:
+        logger.debug("Ignoring non-JSON frame")
+        return None
+
+    if not isinstance(data, dict):
+        logger.debug("Ignoring non-object frame")
+        return None
+
+    if data.get("post_type") == "meta_event":
+        logger.debug("Ignoring meta_event frame")
+        return None
+
+    return data
+
+
 def _parse_timeout(raw: str) -> float:
     if not raw:
         return DEFAULT_TIMEOUT
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # only needed for the msgpack RPC protocol
+    msgspec = None
+
+_MSGPACK_ENCODER = msgspec.msgpack.Encoder() if msgspec is not None else None
+_MSGPACK_DECODER = msgspec.msgpack.Decoder() if msgspec is not None else None
+
+# Raw-frame check for OneBot action replies; pushed events and heartbeats never carry an echo.
+_ECHO_KEY = '"echo"'
+_ECHO_KEY_BYTES = b'"echo"'
+
+
+def has_echo_key(raw: str | bytes) -> bool:
+    """Whether an undecoded frame could be an action reply, checked without parsing it."""
+    return (_ECHO_KEY_BYTES if isinstance(raw, bytes) else _ECHO_KEY) in raw
+
+
+def loads(raw: str | bytes) -> Any:
+    """Decode a JSON document from str or bytes (bytes are parsed without a decode step)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Encode obj as JSON text, keeping non-ASCII characters readable."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """Encode obj as UTF-8 JSON bytes, ready for a binary stream."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def dump_into(obj: Any, out: bytearray) -> None:
+    """
+    Append obj as UTF-8 JSON to out, byte-for-byte what dumps_bytes() returns. msgspec's encode_into
+    is deliberately not used: it accepts sets, bytes and wide ints that orjson/json reject, so the
+    wire format would depend on which extras are installed.
+    """
+    out += dumps_bytes(obj)
+
+
+def msgpack_available() -> bool:
+    return msgspec is not None
+
+
+def msgpack_dumps(obj: Any) -> bytes:
+    if _MSGPACK_ENCODER is None:
+        raise RuntimeError("msgpack support requires msgspec; install nap-msg[msgpack]")
+    return _MSGPACK_ENCODER.encode(obj)
+
+
+def msgpack_loads(data: bytes) -> Any:
+    if _MSGPACK_DECODER is None:
+        raise RuntimeError("msgpack support requires msgspec; install nap-msg[msgpack]")
+    return _MSGPACK_DECODER.decode(data)
+
+
+def msgpack_dump_into(obj: Any, out: bytearray) -> None:
+    if _MSGPACK_ENCODER is None:
+        raise RuntimeError("msgpack support requires msgspec; install nap-msg[msgpack]")
+    _MSGPACK_ENCODER.encode_into(obj, out, -1)
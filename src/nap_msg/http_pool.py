@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import Optional
+
+import httpx
+
+# HTTP/2 needs the h2 package (nap-msg[fast]); without it the pool still reuses HTTP/1.1 keep-alive connections.
+_HTTP2 = importlib.util.find_spec("h2") is not None
+_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def shared_client() -> httpx.AsyncClient:
+    """Process-wide AsyncClient so media downloads and ASR calls reuse TCP/TLS connections."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(http2=_HTTP2, limits=_LIMITS, timeout=10.0)
+    return _client
+
+
+async def aclose_shared_client() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
@@ -1,21 +1,38 @@
 from __future__ import annotations
 
-import base64
-import uuid
+import binascii
+import os
 from enum import Enum
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 
+_B64_CHUNK = 3 * 64 * 1024
+
+
 def _as_file_uri(file_path: str) -> str:
     """
     Convert local file to base64://... or pass through remote/base64 URIs.
     """
     if file_path.startswith("base64://") or file_path.startswith(("http://", "https://")):
         return file_path
-    data = Path(file_path).expanduser().resolve().read_bytes()
-    encoded = base64.b64encode(data).decode("ascii")
-    return f"base64://{encoded}"
+    path = Path(file_path).expanduser().resolve()
+    # Encode in 3-byte-aligned chunks into one prefixed buffer: the raw file is never held whole,
+    # though the buffer and the returned str each still carry the full base64 payload.
+    out = bytearray(b"base64://")
+    chunk = bytearray(_B64_CHUNK)
+    view = memoryview(chunk)
+    with path.open("rb") as handle:
+        while True:
+            size = handle.readinto(chunk)
+            if not size:
+                break
+            if size < _B64_CHUNK:
+                # Short read: top up to keep the boundary on a multiple of 3 so no padding lands mid-stream.
+                while size % 3 and (extra := handle.readinto(view[size:])):
+                    size += extra
+            out += binascii.b2a_base64(view[:size], newline=False)
+    return out.decode("ascii")
 
 
 class CommandType(str, Enum):
@@ -25,10 +42,13 @@ class CommandType(str, Enum):
 
 
 class Command:
+    __slots__ = ("action", "params", "echo")
+
     def __init__(self, action: CommandType, params: Dict[str, Any], echo: Optional[str] = None):
         self.action = action
         self.params = params
-        self.echo = echo or str(uuid.uuid4())
+        # Napcat only echoes the value back; 128 random bits as hex skip uuid4's version bits and formatting.
+        self.echo = echo or os.urandom(16).hex()
 
     def as_dict(self) -> Dict[str, Any]:
         return {"action": self.action.value, "params": self.params, "echo": self.echo}
@@ -37,55 +57,71 @@ class Command:
         return f"Command<action={self.action.value}, params={self.params}>"
 
 
-class TextMessage:
-    def __init__(self, content: str):
-        self.data = {"text": content}
+class _Segment:
+    """Message segment; as_dict() builds a fresh top-level OneBot dict around the live `data`."""
+
+    __slots__ = ("data",)
+    segment_type = ""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
 
     def as_dict(self) -> Dict[str, Any]:
-        return {"type": "text", "data": self.data}
+        return {"type": self.segment_type, "data": self.data}
+
 
+class TextMessage(_Segment):
+    __slots__ = ()
+    segment_type = "text"
+
+    def __init__(self, content: str):
+        super().__init__({"text": content})
+
+
+class ReplyMessage(_Segment):
+    __slots__ = ()
+    segment_type = "reply"
 
-class ReplyMessage:
     def __init__(self, message_id: str):
-        self.data = {"id": str(message_id)}
+        super().__init__({"id": str(message_id)})
 
-    def as_dict(self) -> Dict[str, Any]:
-        return {"type": "reply", "data": self.data}
 
+class FileMessage(_Segment):
+    __slots__ = ()
+    segment_type = "file"
 
-class FileMessage:
     def __init__(self, file_path: str, name: Optional[str] = None):
-        self.data = {"file": _as_file_uri(file_path)}
+        data = {"file": _as_file_uri(file_path)}
         if name:
-            self.data["name"] = name
+            data["name"] = name
+        super().__init__(data)
 
-    def as_dict(self) -> Dict[str, Any]:
-        return {"type": "file", "data": self.data}
 
+class ImageMessage(_Segment):
+    __slots__ = ()
+    segment_type = "image"
 
-class ImageMessage:
     def __init__(self, file_path: str):
-        self.data = {"file": _as_file_uri(file_path)}
+        super().__init__({"file": _as_file_uri(file_path)})
 
-    def as_dict(self) -> Dict[str, Any]:
-        return {"type": "image", "data": self.data}
 
+class VideoMessage(_Segment):
+    __slots__ = ()
+    segment_type = "video"
 
-class VideoMessage:
     def __init__(self, file_path: str):
-        self.data = {"file": _as_file_uri(file_path)}
+        super().__init__({"file": _as_file_uri(file_path)})
 
-    def as_dict(self) -> Dict[str, Any]:
-        return {"type": "video", "data": self.data}
 
+class ForwardNode(_Segment):
+    __slots__ = ()
+    segment_type = "node"
 
-class ForwardNode:
     def __init__(self, user_id: str | int, nickname: str, content: List[Any]):
-        self.data = {
-            "user_id": user_id,
-            "nickname": nickname,
-            "content": [msg.as_dict() if hasattr(msg, "as_dict") else msg for msg in content],
-        }
-
-    def as_dict(self) -> Dict[str, Any]:
-        return {"type": "node", "data": self.data}
+        super().__init__(
+            {
+                "user_id": user_id,
+                "nickname": nickname,
+                "content": [msg.as_dict() if hasattr(msg, "as_dict") else msg for msg in content],
+            }
+        )
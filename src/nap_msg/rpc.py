@@ -1,18 +1,51 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import gc
 import logging
 import os
+import re
+import stat
+import struct
 import sys
-from typing import Any, Optional
-
-from .client import NapcatRelayClient, send_group_message, send_private_message
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from . import codec
+from .asr import credentials_configured as asr_credentials_configured
+from .client import NapcatRelayClient
+from .http_pool import aclose_shared_client
 from .messages import Command, CommandType
 from .watch import DEFAULT_IGNORE_PREFIXES, _event_to_receive_params, watch_forever
 
 logger = logging.getLogger(__name__)
 
+# msgpack protocol: each message is a 4-byte big-endian length followed by the msgpack payload.
+_FRAME_HEADER = struct.Struct(">I")
+_EOF = object()
+
+# Persistent Napcat connections kept per (url, timeout); the least recently used one is closed beyond this.
+MAX_CLIENTS = 4
+
+# Watch notifications queued in one event-loop turn go out as one stdout write, or sooner at this size.
+OUT_BUFFER_LIMIT = 64 * 1024
+
+# Longest JSON request line accepted from stdin (sends can inline base64 attachments).
+STDIN_LINE_LIMIT = 64 * 1024 * 1024
+
+# An oversized request is answered using the id read from its first bytes (JSON-RPC clients put it up front).
+_ID_SCAN_BYTES = 256
+_LEADING_ID_RE = re.compile(rb'\s*\{\s*(?:"jsonrpc"\s*:\s*"[^"\\]*"\s*,\s*)?"id"\s*:\s*(-?\d+|"[^"\\]*")')
+
+# Per-frame dicts/lists are short-lived and acyclic; a high gen0 threshold avoids frequent young collections.
+GC_GEN0_THRESHOLD = 50_000
+
+# Target prefix -> (is_group, prefix length) for to/chatId values.
+_TARGET_PREFIXES = {"group-": (True, 6), "group:": (True, 6), "user-": (False, 5), "user:": (False, 5)}
+_TRUTHY = frozenset({"1", "true", "yes", "y"})
+
+
 def _parse_target_from_params(params: dict) -> tuple[str | None, bool | None]:
     """
     Accepts to/chatId/chat_id with optional prefixes:
@@ -26,90 +59,196 @@ def _parse_target_from_params(params: dict) -> tuple[str | None, bool | None]:
 
     if isinstance(raw_to, (str, int)):
         text = str(raw_to).strip()
-        if text.lower().startswith("group-"):
-            chat_id = text[len("group-") :].strip()
-            is_group = True
-        elif text.lower().startswith("group:"):
-            chat_id = text.split(":", 1)[1].strip()
-            is_group = True
-        elif text.lower().startswith("user-"):
-            chat_id = text[len("user-") :].strip()
-            is_group = False
-        elif text.lower().startswith("user:"):
-            chat_id = text.split(":", 1)[1].strip()
-            is_group = False
+        # "group-"/"group:" are 6 chars, "user-"/"user:" 5: one lowercased slice, one or two dict probes.
+        head = text[:6].lower()
+        target = _TARGET_PREFIXES.get(head) or _TARGET_PREFIXES.get(head[:5])
+        if target is not None:
+            is_group, prefix_len = target
+            chat_id = text[prefix_len:].strip()
         else:
             chat_id = text
 
     if isinstance(is_group, str):
-        is_group = is_group.lower() in ("1", "true", "yes", "y")
+        is_group = is_group.lower() in _TRUTHY
 
     return chat_id, is_group if isinstance(is_group, bool) else None
 
 
+def _build_send_command(params: dict) -> Command:
+    """Translate send params (channel, group_id/user_id, message/messages) into a Napcat command."""
+    if not isinstance(params, dict):
+        raise ValueError("send params must be an object")
+    channel = params.get("channel") or params.get("type")
+    group_id = params.get("group_id")
+    user_id = params.get("user_id")
+
+    if not channel:
+        if group_id:
+            channel = "group"
+        elif user_id:
+            channel = "private"
+
+    if channel == "group_forward":
+        messages = params.get("messages") or params.get("nodes")
+        if not messages:
+            raise ValueError("messages is required for group_forward")
+        return Command(CommandType.SEND_GROUP_FORWARD_MSG, {"group_id": str(group_id), "messages": messages})
+    if channel == "group":
+        message = params.get("message")
+        if not message:
+            raise ValueError("message is required for group send")
+        return Command(CommandType.SEND_GROUP_MSG, {"group_id": str(group_id), "message": message})
+    if channel == "private":
+        message = params.get("message")
+        if not message:
+            raise ValueError("message is required for private send")
+        return Command(CommandType.SEND_PRIVATE_MSG, {"user_id": str(user_id), "message": message})
+    raise ValueError("Unsupported channel; use group, group_forward, or private")
+
+
 class RpcServer:
-    def __init__(self, default_url: Optional[str] = None, default_timeout: Optional[float] = None) -> None:
+    def __init__(
+        self, default_url: Optional[str] = None, default_timeout: Optional[float] = None, protocol: str = "json"
+    ) -> None:
+        self._protocol = protocol
         self._watch_tasks: dict[int, asyncio.Task] = {}
         self._next_subscription_id = 1
-        self._default_url = default_url
+        # NAPCAT_URL is read once here rather than on every subscribe/warmup.
+        self._default_url = default_url or os.getenv("NAPCAT_URL")
         self._default_timeout = default_timeout
+        self._out = bytearray()
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._stdin: Optional[asyncio.StreamReader] = None
+        # Blocking-read fallback for non-pipe stdin; one thread keeps reads ordered and off the default pool.
+        self._stdin_executor: Optional[ThreadPoolExecutor] = None
+        self._clients: OrderedDict[tuple[Any, Any], NapcatRelayClient] = OrderedDict()
+        self._methods = {
+            "initialize": self._handle_initialize,
+            "watch.subscribe": self._handle_subscribe,
+            "watch.unsubscribe": self._handle_unsubscribe,
+            "message.send": self._handle_message_send,
+            "send": self._handle_send,
+            "send.batch": self._handle_send_batch,
+            "messages.history": self._handle_history,
+            "chats.list": self._handle_chats_list,
+        }
 
     async def serve(self) -> None:
-        """Run a JSON-RPC loop over stdin/stdout (one JSON object per line)."""
-        while True:
-            line = await asyncio.to_thread(sys.stdin.readline)
-            if not line:
-                break
-            line = line.strip()
-            if not line:
-                continue
-            logger.info("stdin>%s", line)
+        """Run a JSON-RPC loop over stdin/stdout (JSON lines, or length-prefixed msgpack frames)."""
+        self._stdin = await _open_stdin_reader()
+        if self._stdin is None:
+            self._stdin_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpc-stdin")
+        read_request = self._read_msgpack_request if self._protocol == "msgpack" else self._read_json_request
+        warmup = asyncio.create_task(self._warm_default_client())
+        try:
+            while True:
+                request = await read_request()
+                if request is _EOF:
+                    break
+                if request is None:
+                    continue
+
+                try:
+                    await self._handle_request(request)
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("Unhandled RPC error: %s", exc)
+                    self._write_error(request.get("id"), code=-32000, message=str(exc))
+        finally:
+            warmup.cancel()
+            await self._stop_watch()
+            await self._close_clients()
+            await aclose_shared_client()
+            if self._stdin_executor is not None:
+                self._stdin_executor.shutdown(wait=False)
+            self._flush()
+
+    async def _read_json_request(self) -> Any:
+        if self._stdin is not None:
             try:
-                request = json.loads(line)
-            except Exception as exc:  # noqa: BLE001
-                logger.warning("Invalid JSON request: %s", exc)
-                continue
+                line = await self._stdin.readuntil(b"\n")
+            except asyncio.IncompleteReadError as exc:  # EOF; the last line may lack its newline
+                line = exc.partial
+            except asyncio.LimitOverrunError:
+                await self._drop_oversized_request()
+                return None
+        else:
+            line = await asyncio.get_running_loop().run_in_executor(self._stdin_executor, sys.stdin.buffer.readline)
+        if not line:
+            return _EOF
+        line = line.strip()
+        if not line:
+            return None
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("stdin>%s", line.decode("utf-8", "replace"))
+        try:
+            return codec.loads(line)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Invalid JSON request: %s", exc)
+            return None
 
+    async def _drop_oversized_request(self) -> None:
+        """Discard a line longer than STDIN_LINE_LIMIT through its newline, then answer it with an error."""
+        head = b""
+        while True:
             try:
-                await self._handle_request(request)
-            except Exception as exc:  # noqa: BLE001
-                logger.exception("Unhandled RPC error: %s", exc)
-                self._write_error(request.get("id"), code=-32000, message=str(exc))
-        await self._stop_watch()
+                await self._stdin.readuntil(b"\n")
+                break
+            except asyncio.LimitOverrunError as exc:
+                # The buffered bytes before the (possibly not yet seen) newline can be dropped as-is.
+                chunk = await self._stdin.readexactly(exc.consumed)
+                head = head or chunk[:_ID_SCAN_BYTES]
+            except asyncio.IncompleteReadError:
+                break
+        logger.warning("Dropping request longer than %d bytes", STDIN_LINE_LIMIT)
+        error_obj = {"code": -32600, "message": f"Request exceeds {STDIN_LINE_LIMIT} bytes"}
+        self._write_json({"jsonrpc": "2.0", "id": _leading_request_id(head), "error": error_obj})
+
+    async def _read_msgpack_request(self) -> Any:
+        header = await self._read_stdin_exact(_FRAME_HEADER.size)
+        if len(header) < _FRAME_HEADER.size:
+            return _EOF
+        (size,) = _FRAME_HEADER.unpack(header)
+        payload = await self._read_stdin_exact(size)
+        if len(payload) < size:
+            return _EOF
+        logger.info("stdin> msgpack frame bytes=%d", size)
+        try:
+            return codec.msgpack_loads(payload)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Invalid msgpack request: %s", exc)
+            return None
+
+    async def _read_stdin_exact(self, size: int) -> bytes:
+        if self._stdin is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._stdin_executor, _read_exact, sys.stdin.buffer, size
+            )
+        try:
+            return await self._stdin.readexactly(size)
+        except asyncio.IncompleteReadError as exc:
+            return exc.partial
 
     async def _handle_request(self, request: dict) -> None:
         method = request.get("method")
         req_id = request.get("id")
         params = request.get("params") or {}
 
-        if method == "initialize":
-            self._handle_initialize(req_id)
-            return
-        if method == "watch.subscribe":
-            await self._handle_subscribe(params, req_id)
-            return
-        if method == "watch.unsubscribe":
-            await self._handle_unsubscribe(params, req_id)
-            return
-        if method == "message.send":
-            await self._handle_message_send(params, req_id)
-            return
-        if method == "send":
-            await self._handle_send(params, req_id)
-            return
-        if method == "messages.history":
-            self._write_result(req_id, {"messages": []})
+        handler = self._methods.get(method)
+        if handler is None:
+            self._write_error(req_id, code=-32601, message="Method not found")
             return
-        if method == "chats.list":
-            self._write_result(req_id, [])
-            return
-
-        self._write_error(req_id, code=-32601, message="Method not found")
+        await handler(params, req_id)
 
-    def _handle_initialize(self, req_id: Any) -> None:
+    async def _handle_initialize(self, params: dict, req_id: Any) -> None:
         result = {"capabilities": {"streaming": True, "attachments": True}}
         self._write_result(req_id, result)
 
+    async def _handle_history(self, params: dict, req_id: Any) -> None:
+        self._write_result(req_id, {"messages": []})
+
+    async def _handle_chats_list(self, params: dict, req_id: Any) -> None:
+        self._write_result(req_id, [])
+
     async def _handle_message_send(self, params: dict, req_id: Any) -> None:
         text = params.get("text")
         chat_id, is_group = _parse_target_from_params(params)
@@ -117,22 +256,16 @@ class RpcServer:
             self._write_error(req_id, code=-32602, message="to/chatId and text are required")
             return
 
-        channel = "group" if is_group else "private"
+        # Build the command directly instead of round-tripping through send params.
         message = [{"type": "text", "data": {"text": text}}]
-        await self._handle_send(
-            {
-                "channel": channel,
-                "group_id": chat_id if channel == "group" else None,
-                "user_id": chat_id if channel == "private" else None,
-                "message": message,
-                "napcat_url": params.get("napcat_url"),
-                "timeout": params.get("timeout"),
-            },
-            req_id,
-        )
+        if is_group:
+            command = Command(CommandType.SEND_GROUP_MSG, {"group_id": str(chat_id), "message": message})
+        else:
+            command = Command(CommandType.SEND_PRIVATE_MSG, {"user_id": str(chat_id), "message": message})
+        await self._send(params, command, req_id)
 
     async def _handle_subscribe(self, params: dict, req_id: Any) -> None:
-        url = params.get("napcat_url") or self._default_url or os.getenv("NAPCAT_URL")
+        url = params.get("napcat_url") or self._default_url
         if not url:
             self._write_error(req_id, code=-32000, message="NAPCAT_URL is required")
             return
@@ -140,14 +273,15 @@ class RpcServer:
         from_group = params.get("from_group")
         from_user = params.get("from_user")
         ignore_prefixes = params.get("ignore_prefixes") or DEFAULT_IGNORE_PREFIXES
-        asr_enabled = _asr_enabled()
+        asr_enabled = asr_credentials_configured()
 
         sub_id = self._next_subscription_id
         self._next_subscription_id += 1
 
-        async def _emit(event: dict) -> None:
+        # Plain function: notifications only go into the batched stdout buffer, so there is nothing to await.
+        def _emit(event: dict) -> None:
             payload = {"subscription": sub_id, "message": _event_to_receive_params(event)}
-            self._write_json({"jsonrpc": "2.0", "method": "message", "params": payload})
+            self._write_json({"jsonrpc": "2.0", "method": "message", "params": payload}, buffered=True)
 
         task = asyncio.create_task(
             watch_forever(
@@ -174,38 +308,17 @@ class RpcServer:
         self._write_result(req_id, {"ok": True})
 
     async def _handle_send(self, params: dict, req_id: Any) -> None:
-        channel = params.get("channel") or params.get("type")
-        group_id = params.get("group_id")
-        user_id = params.get("user_id")
-        timeout = params.get("timeout") or self._default_timeout
-        client = NapcatRelayClient(url=params.get("napcat_url") or self._default_url, timeout=timeout)
-
-        if not channel:
-            if group_id:
-                channel = "group"
-            elif user_id:
-                channel = "private"
+        try:
+            command = _build_send_command(params)
+        except ValueError as exc:
+            self._write_error(req_id, code=-32000, message=str(exc))
+            return
+        await self._send(params, command, req_id)
 
+    async def _send(self, params: dict, command: Command, req_id: Any) -> None:
+        client = await self._client_for(params)
         try:
-            if channel == "group_forward":
-                messages = params.get("messages") or params.get("nodes")
-                if not messages:
-                    raise ValueError("messages is required for group_forward")
-                payload = {"group_id": str(group_id), "messages": messages}
-                command = Command(CommandType.SEND_GROUP_FORWARD_MSG, payload)
-                result = await client.send_command(command)
-            elif channel == "group":
-                message = params.get("message")
-                if not message:
-                    raise ValueError("message is required for group send")
-                result = await send_group_message(client, group_id, message)
-            elif channel == "private":
-                message = params.get("message")
-                if not message:
-                    raise ValueError("message is required for private send")
-                result = await send_private_message(client, user_id, message)
-            else:
-                raise ValueError("Unsupported channel; use group, group_forward, or private")
+            result = await client.send_command(command)
         except Exception as exc:  # noqa: BLE001
             logger.debug("send failed: %s", exc)
             self._write_error(req_id, code=-32000, message=str(exc))
@@ -213,6 +326,63 @@ class RpcServer:
 
         self._write_result(req_id, result)
 
+    async def _handle_send_batch(self, params: dict, req_id: Any) -> None:
+        requests = params.get("requests")
+        if not isinstance(requests, list) or not requests:
+            self._write_error(req_id, code=-32602, message="requests must be a non-empty list")
+            return
+
+        try:
+            commands = [_build_send_command(item) for item in requests]
+        except ValueError as exc:
+            self._write_error(req_id, code=-32000, message=str(exc))
+            return
+
+        client = await self._client_for(params)
+        try:
+            # Per-command failures come back as {"error": ...} items; only nothing-sent failures land here.
+            results = await client.send_batch(commands)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("send.batch failed: %s", exc)
+            self._write_error(req_id, code=-32000, message=str(exc))
+            return
+
+        self._write_result(req_id, results)
+
+    async def _client_for(self, params: dict) -> NapcatRelayClient:
+        """Return the persistent client for the call's (url, timeout), dialing lazily on first send."""
+        key = (params.get("napcat_url") or self._default_url, params.get("timeout") or self._default_timeout)
+        client = self._clients.get(key)
+        if client is not None:
+            self._clients.move_to_end(key)
+            return client
+
+        client = NapcatRelayClient(url=key[0], timeout=key[1], persistent=True)
+        self._clients[key] = client
+        if len(self._clients) > MAX_CLIENTS:
+            _, evicted = self._clients.popitem(last=False)
+            await evicted.close()
+        return client
+
+    async def _warm_default_client(self) -> None:
+        """Open the default Napcat connection up front so the first send skips the handshake."""
+        if not self._default_url:
+            return
+        client = await self._client_for({})
+        try:
+            await client.connect()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Napcat connection not ready yet, will retry on first send: %s", exc)
+
+    async def _close_clients(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        # Close handshakes run side by side, so shutdown waits for the slowest socket, not their sum.
+        results = await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.debug("Error closing Napcat client: %s", result)
+
     async def _stop_watch(self) -> None:
         if not self._watch_tasks:
             return
@@ -220,11 +390,8 @@ class RpcServer:
         self._watch_tasks.clear()
         for task in tasks:
             task.cancel()
-        for task in tasks:
-            try:
-                await task
-            except asyncio.CancelledError:
-                continue
+        # One failing watch must not abort the teardown of the others.
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     async def _cancel_subscription(self, sub_id: int) -> None:
         task = self._watch_tasks.pop(sub_id, None)
@@ -247,20 +414,138 @@ class RpcServer:
         error_obj = {"code": code, "message": message}
         self._write_json({"jsonrpc": "2.0", "id": req_id, "error": error_obj})
 
-    def _write_json(self, obj: dict) -> None:
-        sys.stdout.write(json.dumps(obj, ensure_ascii=False))
-        sys.stdout.write("\n")
-        sys.stdout.flush()
+    def _write_json(self, obj: dict, buffered: bool = False) -> None:
+        """Queue one framed message; buffered notifications are coalesced, anything else flushes now."""
+        start = len(self._out)
+        try:
+            if self._protocol == "msgpack":
+                # Reserve the length header, encode in place, then patch in the payload size.
+                self._out += bytes(_FRAME_HEADER.size)
+                codec.msgpack_dump_into(obj, self._out)
+                _FRAME_HEADER.pack_into(self._out, start, len(self._out) - start - _FRAME_HEADER.size)
+            else:
+                codec.dump_into(obj, self._out)
+                self._out += b"\n"
+        except Exception:
+            del self._out[start:]
+            raise
+
+        if buffered and len(self._out) < OUT_BUFFER_LIMIT:
+            if self._flush_handle is None:
+                # Flush once the loop goes idle: bursts still coalesce, without a fixed latency.
+                self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+            return
+        self._flush()
 
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._out:
+            return
+        write_stdout(self._out)
+        self._out.clear()
 
-def _asr_enabled() -> bool:
-    return bool(os.getenv("TENCENT_SECRET_ID", "").strip() and os.getenv("TENCENT_SECRET_KEY", "").strip())
 
+def write_stdout(data: bytes | bytearray) -> None:
+    """
+    Write data to stdout with os.write (no BufferedWriter copy or separate flush), looping on
+    short writes to pipes; falls back to sys.stdout.buffer when stdout has no real descriptor.
+    """
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+async def _open_stdin_reader() -> Optional[asyncio.StreamReader]:
+    """
+    Attach stdin to the event loop so requests are read without a thread hop per line.
+    Only done when stdin is its own pipe/socket: the loop makes fd 0 non-blocking, which would
+    leak onto stdout when both share one open file (a TTY, or a single socket for both).
+    Returns None to keep the threaded blocking reads.
+    """
+    try:
+        stdin_stat = os.fstat(sys.stdin.fileno())
+        stdout_stat = os.fstat(sys.stdout.fileno())
+    except (AttributeError, OSError, ValueError):
+        return None
+    if not (stat.S_ISFIFO(stdin_stat.st_mode) or stat.S_ISSOCK(stdin_stat.st_mode)):
+        return None
+    if (stdin_stat.st_dev, stdin_stat.st_ino) == (stdout_stat.st_dev, stdout_stat.st_ino):
+        return None
+    reader = asyncio.StreamReader(limit=STDIN_LINE_LIMIT)
+    try:
+        await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer
+        )
+    except (NotImplementedError, OSError, ValueError) as exc:
+        logger.debug("Falling back to threaded stdin reads: %s", exc)
+        return None
+    return reader
+
+
+def _read_exact(stream, size: int) -> bytes:
+    """Read size bytes from a blocking stream; a shorter result means EOF."""
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = stream.read(size - len(chunks))
+        if not chunk:
+            break
+        chunks += chunk
+    return bytes(chunks)
+
+
+def _leading_request_id(head: bytes) -> Any:
+    """The id of a request from its leading bytes, or None (JSON-RPC's null id) when it is not up front."""
+    match = _LEADING_ID_RE.match(head)
+    return codec.loads(match.group(1)) if match else None
 
-def run_rpc_server(default_url: Optional[str] = None, default_timeout: Optional[float] = None) -> int:
-    server = RpcServer(default_url=default_url, default_timeout=default_timeout)
+
+def _loop_factory() -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """
+    Prefer uvloop for the long-running server when it is installed.
+    NAP_MSG_LOOP=asyncio forces the stdlib loop; NAP_MSG_LOOP=uvloop requires uvloop.
+    """
+    choice = os.getenv("NAP_MSG_LOOP", "").strip().lower()
+    if choice == "asyncio":
+        return None
+    if choice not in ("", "uvloop"):
+        logger.warning("Unknown NAP_MSG_LOOP=%r; expected uvloop or asyncio", choice)
+    try:
+        import uvloop
+    except ImportError:
+        if choice == "uvloop":
+            logger.warning("NAP_MSG_LOOP=uvloop but uvloop is not installed; using asyncio")
+        return None
+    logger.debug("Using uvloop event loop")
+    return uvloop.new_event_loop
+
+
+def _tune_gc() -> None:
+    """Move startup objects out of the collector's view and make young-generation passes rarer."""
+    gc.collect()
+    gc.freeze()
+    gc.set_threshold(GC_GEN0_THRESHOLD, 10, 10)
+
+
+def run_rpc_server(
+    default_url: Optional[str] = None, default_timeout: Optional[float] = None, protocol: str = "json"
+) -> int:
+    if protocol == "msgpack" and not codec.msgpack_available():
+        sys.stderr.write("msgpack protocol requires msgspec; install nap-msg[msgpack]\n")
+        return 2
+    server = RpcServer(default_url=default_url, default_timeout=default_timeout, protocol=protocol)
+    _tune_gc()
     try:
-        asyncio.run(server.serve())
+        with asyncio.Runner(loop_factory=_loop_factory()) as runner:
+            runner.run(server.serve())
         return 0
     except KeyboardInterrupt:
         return 0
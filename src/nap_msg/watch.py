@@ -1,21 +1,40 @@
 from __future__ import annotations
 
 import asyncio
-import base64
+import contextlib
+import functools
+import itertools
 import json
 import logging
+import re
 import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse
 
-import httpx
-import websockets
+from websockets.exceptions import ConnectionClosed
 
+try:
+    from pybase64 import b64decode
+except ImportError:  # optional SIMD decoder for voice payloads; stdlib is the fallback
+    # base64.b64decode only wraps this after its own type checks; a2b_base64 takes the str as-is.
+    from binascii import a2b_base64 as b64decode
+
+try:
+    import msgspec
+except ImportError:  # optional: schema-driven decode of watch frames
+    msgspec = None
+
+from . import codec
 from .asr import sentence_recognize
+from .http_pool import shared_client
+from .ws_compat import connect as _ws_connect, receiver as _ws_receiver
 
-KEEP_FIELDS = {
+logger = logging.getLogger(__name__)
+
+# Emitted event fields, in output order. The projection walks this short tuple rather than every event key.
+_KEEP_ORDER = (
     "user_id",
     "group_id",
     "message_type",
@@ -26,12 +45,126 @@ KEEP_FIELDS = {
     "files",
     # "time",
     # "target_id",
-}
+)
+KEEP_FIELDS = frozenset(_KEEP_ORDER)
+
+# Napcat is normally on the same host: skip permessage-deflate, and fail stuck handshakes fast.
+_WS_OPTIONS = {"max_size": None, "compression": None, "open_timeout": 5, "close_timeout": 5}
+_RECONNECT_DELAY = 3.0
+
+# Frames read ahead while one message is being handled (downloads, ASR). The reader pauses at this many,
+# except while a request() is outstanding: its reply can only arrive through the reader.
+_FRAME_QUEUE_SIZE = 64
+
+# get_record replies only need to be told apart on our own event socket; a counter is enough.
+_VOICE_ECHOES = itertools.count(1)
+
+# Raw-frame scans used to drop frames before decoding. Escaped quotes inside JSON strings never match.
+_POST_TYPE_RE = re.compile(rb'"post_type"\s*:\s*"([^"\\]*)"')
+_GROUP_ID_RE = re.compile(rb'"group_id"\s*:\s*"?(-?\d+)')
+_USER_ID_RE = re.compile(rb'"user_id"\s*:\s*"?(-?\d+)')
+
+# Media segment type -> bucket name in the emitted event.
+_MEDIA_BUCKETS = {"image": "images", "video": "videos", "file": "files"}
+_JSON_DECODER = json.JSONDecoder()
+
+if msgspec is not None:
+
+    class _WatchEvent(msgspec.Struct):
+        """Only the fields the watch loop reads; msgspec skips everything else without building objects."""
+
+        post_type: Optional[str] = None
+        message_type: Optional[str] = None
+        message_id: Optional[int | str] = None
+        user_id: Optional[int | str] = None
+        group_id: Optional[int | str] = None
+        message: Optional[list | str] = None
+
+    _EVENT_DECODER = msgspec.json.Decoder(_WatchEvent)
+    _EVENT_FIELDS = _WatchEvent.__struct_fields__
+else:
+    _EVENT_DECODER = None
+
+_HANDLED_SEGMENTS = frozenset({"text", "record", *_MEDIA_BUCKETS})
+# Stand-in for segments without a data object; only ever read with .get(), never mutated.
+_EMPTY_DATA: dict = {}
 
 DEFAULT_IGNORE_PREFIXES = ["/"]
 PASSTHROUGH_COMMANDS = {"/new", "/reset"}
 
 
+class _FrameReader:
+    """Drain one Napcat connection on a background task so the socket keeps being read while events are handled.
+
+    Action replies are routed by echo to the request() waiting on them; every other frame goes to recv().
+    """
+
+    __slots__ = ("_ws", "_queue", "_pending", "_wake", "_task")
+
+    def __init__(self, ws) -> None:
+        self._ws = ws
+        # Unbounded queue; _pump enforces _FRAME_QUEUE_SIZE itself so pending replies can bypass it.
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: dict[str, asyncio.Future] = {}
+        # Set when the consumer takes a frame or starts a request(), so a paused reader re-checks.
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._pump())
+
+    async def _pump(self) -> None:
+        recv = _ws_receiver(self._ws)
+        queue = self._queue
+        try:
+            while True:
+                while queue.qsize() >= _FRAME_QUEUE_SIZE and not self._pending:
+                    self._wake.clear()
+                    await self._wake.wait()
+                raw = await recv()
+                if self._pending and self._dispatch_reply(raw):
+                    continue
+                queue.put_nowait(raw)
+        except Exception as exc:  # noqa: BLE001 - handed to the consumer, which owns reconnecting
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(exc)
+            queue.put_nowait(exc)
+
+    def _dispatch_reply(self, raw: str | bytes) -> bool:
+        # Pushed events and heartbeats carry no echo key; only candidate replies get decoded here.
+        if not codec.has_echo_key(raw):
+            return False
+        reply = _try_parse_json(raw)
+        future = self._pending.pop(reply.get("echo"), None) if type(reply) is dict else None
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(reply)
+        return True
+
+    async def recv(self) -> str | bytes:
+        item = await self._queue.get()
+        self._wake.set()
+        if isinstance(item, Exception):
+            # Keep the failure queued so every later recv() (voice fetch, then the watch loop) sees it too.
+            self._queue.put_nowait(item)
+            raise item
+        return item
+
+    async def request(self, body: dict, timeout: float) -> dict:
+        """Send an action and wait for the reply carrying its echo."""
+        echo = body["echo"]
+        future = asyncio.get_running_loop().create_future()
+        self._pending[echo] = future
+        self._wake.set()
+        try:
+            await self._ws.send(codec.dumps(body))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(echo, None)
+
+    def close(self) -> None:
+        self._task.cancel()
+
+
 async def watch_forever(
     url: str,
     from_group: Optional[str],
@@ -40,65 +173,184 @@ async def watch_forever(
     asr_enabled: bool,
     emit,
 ) -> None:
+    group_ids = _id_forms(from_group)
+    user_ids = _id_forms(from_user)
+    group_keys = _id_keys(group_ids)
+    user_keys = _id_keys(user_ids)
+    # str.startswith takes a tuple and checks every prefix in one C call (faster than a regex for short lists).
+    ignore_tuple = tuple(ignore_prefixes or ())
+    loop = asyncio.get_running_loop()
     while True:
         try:
-            logging.info("Connecting to Napcat event stream %s", url)
-            async with websockets.connect(url, max_size=None) as ws:
-                while True:
-                    raw = await ws.recv()
-                    logging.debug("WS raw frame: %s", raw)
-                    event = _try_parse_json(raw)
-                    if not event:
-                        continue
-                    if event.get("post_type") != "message":
-                        continue
-                    if from_group and str(event.get("group_id")) != str(from_group):
-                        continue
-                    if from_user and str(event.get("user_id")) != str(from_user):
-                        continue
-
-                    text_content, media = await _extract_message_content(event, ws, url, asr_enabled)
-                    has_media = any(media.values())
-                    if text_content:
-                        first_line = next((ln for ln in text_content.splitlines() if ln.strip()), text_content)
-                        check_text = first_line.lstrip()
-                        passthrough_command = _is_passthrough_command(check_text)
-                        if ignore_prefixes and not passthrough_command and any(
-                            check_text.startswith(pfx) for pfx in ignore_prefixes
-                        ):
-                            continue
-                    if not text_content and not has_media:
-                        continue
-
-                    if text_content:
-                        event["text"] = text_content
-                    for key, values in media.items():
-                        if values:
-                            event[key] = values
-                    filtered = {k: v for k, v in event.items() if k in KEEP_FIELDS and v is not None}
+            # Iterating connect() re-dials right away (with the library's backoff) when the stream drops.
+            # aclosing() shuts the current socket as soon as an error leaves the loop, before the next dial.
+            async with contextlib.aclosing(aiter(_ws_connect(url, **_WS_OPTIONS))) as connections:
+                async for ws in connections:
+                    logger.info("Connected to Napcat event stream %s", url)
+                    opened_at = loop.time()
+                    frames = _FrameReader(ws)
                     try:
-                        maybe_coro = emit(filtered)
-                        if asyncio.iscoroutine(maybe_coro):
-                            await maybe_coro
-                    except Exception as emit_exc:  # noqa: BLE001
-                        logging.warning("Failed to emit event: %s", emit_exc)
+                        # Level is checked once per connection so the per-frame path skips the logging call.
+                        log_frames = logger.isEnabledFor(logging.DEBUG)
+                        while True:
+                            raw = await frames.recv()
+                            if log_frames:
+                                logger.debug("WS raw frame: %s", raw)
+                            if not _fast_prefilter(raw, group_keys, user_keys):
+                                continue
+                            # Usually one event per frame; buffered pushes may concatenate several.
+                            for event in _iter_events(raw):
+                                if event.get("post_type") != "message":
+                                    continue
+                                if group_ids and event.get("group_id") not in group_ids:
+                                    continue
+                                if user_ids and event.get("user_id") not in user_ids:
+                                    continue
+
+                                text_content, media = await _extract_message_content(event, frames, url, asr_enabled)
+                                has_media = any(media.values())
+                                if text_content:
+                                    # lstrip() also skips leading blank lines, so the first non-blank line
+                                    # is everything up to the next newline; no need to split the whole text.
+                                    check_text = text_content.lstrip()
+                                    newline = check_text.find("\n")
+                                    if newline != -1:
+                                        check_text = check_text[:newline]
+                                    # Passthrough commands (/new, /reset) are only looked up for ignored text.
+                                    if (
+                                        ignore_tuple
+                                        and check_text.startswith(ignore_tuple)
+                                        and check_text.rstrip() not in PASSTHROUGH_COMMANDS
+                                    ):
+                                        continue
+                                if not text_content and not has_media:
+                                    continue
+
+                                if text_content:
+                                    event["text"] = text_content
+                                for key, values in media.items():
+                                    if values:
+                                        event[key] = values
+                                filtered = {k: v for k in _KEEP_ORDER if (v := event.get(k)) is not None}
+                                try:
+                                    maybe_coro = emit(filtered)
+                                    if asyncio.iscoroutine(maybe_coro):
+                                        await maybe_coro
+                                except Exception as emit_exc:  # noqa: BLE001
+                                    logger.warning("Failed to emit event: %s", emit_exc)
+                    except ConnectionClosed as exc:
+                        # A long-lived stream that drops is re-dialled at once; one closed right after
+                        # the handshake (auth/config problem) waits so it cannot spin.
+                        if loop.time() - opened_at < _RECONNECT_DELAY:
+                            logger.warning("Napcat event stream closed (%s), reconnecting in 3s", exc)
+                            await asyncio.sleep(_RECONNECT_DELAY)
+                        else:
+                            logger.warning("Napcat event stream closed (%s), reconnecting", exc)
+                        continue
+                    finally:
+                        frames.close()
         except asyncio.CancelledError:
             raise
         except Exception as exc:  # noqa: BLE001
-            logging.warning("Watch loop error %s, reconnecting in 3s", exc)
-            await asyncio.sleep(3)
+            logger.warning("Watch loop error %s, reconnecting in 3s", exc)
+            await asyncio.sleep(_RECONNECT_DELAY)
 
 
-def _try_parse_json(raw: str) -> Optional[dict]:
+def _id_forms(value: Optional[str | int]) -> frozenset:
+    """Accepted forms of a target id ({123, "123"}), so frames match by one set lookup without str()."""
+    if not value:
+        return frozenset()
+    text = str(value).strip()
+    forms: set = {text}
+    try:
+        forms.add(int(text))
+    except ValueError:
+        pass
+    return frozenset(forms)
+
+
+def _id_keys(ids: frozenset) -> frozenset[bytes]:
+    return frozenset(str(value).encode("ascii") for value in ids if isinstance(value, int))
+
+
+def _fast_prefilter(raw: str | bytes, group_keys: frozenset[bytes], user_keys: frozenset[bytes]) -> bool:
+    """
+    Scan the undecoded frame for post_type/group_id/user_id. Returns False only when every
+    occurrence of a field rules the frame out; nested fields (e.g. sender.user_id) or
+    unexpected formatting fall through to the full decode and the regular checks.
+    """
+    if not isinstance(raw, bytes):
+        return True
+    post_types = _POST_TYPE_RE.findall(raw)
+    if post_types and b"message" not in post_types:
+        return False
+    if group_keys:
+        found = _GROUP_ID_RE.findall(raw)
+        if found and group_keys.isdisjoint(found):
+            return False
+    if user_keys:
+        found = _USER_ID_RE.findall(raw)
+        if found and user_keys.isdisjoint(found):
+            return False
+    return True
+
+
+def _try_parse_json(raw: str | bytes) -> Optional[dict]:
     try:
-        return json.loads(raw)
+        return codec.loads(raw)
     except Exception:
-        logging.debug("Failed to decode websocket frame as JSON")
+        logger.debug("Failed to decode websocket frame as JSON")
         return None
 
+
+def _iter_events(raw: str | bytes) -> list[dict]:
+    """
+    Decode a frame into its JSON objects. A frame that is not one document is retried as
+    concatenated/newline-separated documents; anything after the first bad one is dropped.
+    """
+    if _EVENT_DECODER is not None:
+        try:
+            event = _EVENT_DECODER.decode(raw)
+        except msgspec.DecodeError:
+            pass  # not a single object of the expected shape; the generic paths below decide
+        else:
+            return [{name: getattr(event, name) for name in _EVENT_FIELDS}]
+
+    try:
+        data = codec.loads(raw)
+    except Exception:
+        pass
+    else:
+        return [data] if isinstance(data, dict) else []
+
+    try:
+        text = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+    except UnicodeDecodeError:
+        logger.debug("Failed to decode websocket frame as UTF-8")
+        return []
+    events: list[dict] = []
+    index, end = 0, len(text)
+    while True:
+        while index < end and text[index].isspace():
+            index += 1
+        if index >= end:
+            break
+        try:
+            data, index = _JSON_DECODER.raw_decode(text, index)
+        except ValueError:
+            logger.debug("Failed to decode websocket frame as JSON at offset %d", index)
+            break
+        if isinstance(data, dict):
+            events.append(data)
+    return events
+
+
 def _event_to_receive_params(event: dict) -> dict:
-    message_type = str(event.get("message_type") or "").lower()
+    message_type = event.get("message_type")
+    # Napcat sends "group"/"private" as-is; only unusual values pay for the normalization.
     is_group = message_type == "group"
+    if not is_group and message_type != "private" and isinstance(message_type, str):
+        is_group = message_type.lower() == "group"
     chat_id = event.get("group_id") if is_group else event.get("user_id")
     return {
         "sender": event.get("user_id"),
@@ -125,54 +377,51 @@ async def _extract_message_content(
     media: dict[str, list[str]] = {"images": [], "videos": [], "files": []}
     record_text = None
     for item in message:
-        if not isinstance(item, dict):
+        # Decoded JSON never yields dict subclasses, so exact type checks are enough (and cheaper).
+        if type(item) is not dict:
             continue
 
         seg_type = item.get("type", "")
-        seg_data = item.get("data", {}) or {}
-
-        raw_sub_type = item.get("sub_type", seg_data.get("sub_type", 0))
-        try:
-            sub_type = int(raw_sub_type)
-        except Exception:
-            sub_type = 0
-
-        # sub_type 1: emoji/face payloads that should be ignored
-        if sub_type == 1:
+        # at/face/reply/json/... contribute nothing; drop them before any per-segment parsing.
+        if seg_type not in _HANDLED_SEGMENTS:
             continue
+        seg_data = item.get("data")
+        if type(seg_data) is not dict:
+            seg_data = _EMPTY_DATA
+
+        # sub_type 1: emoji/face payloads that should be ignored. Usually absent or 0, which skips int().
+        raw_sub_type = item["sub_type"] if "sub_type" in item else seg_data.get("sub_type")
+        if raw_sub_type:
+            try:
+                if int(raw_sub_type) == 1:
+                    continue
+            except (TypeError, ValueError):
+                pass
 
-        if seg_type == "at":
-            continue
         if seg_type == "text":
             txt = seg_data.get("text")
-            if isinstance(txt, str):
+            if isinstance(txt, str) and (txt := txt.strip()):
                 text_parts.append(txt)
         elif seg_type == "record" and record_text is None:
             rec_path = seg_data.get("file")
             if isinstance(rec_path, str) and rec_path.strip():
                 record_text = await _resolve_text(None, rec_path.strip(), ws, napcat_ws, allow_asr)
-        elif seg_type == "face":
-            continue
-        elif seg_type in {"image", "video", "file"}:
+        elif seg_type in _MEDIA_BUCKETS:
             url = seg_data.get("url", "")
             if not url:
                 continue
 
             local_path = await _download_media(url, media_type=seg_type)
             if local_path:
-                bucket = {
-                    "image": "images",
-                    "video": "videos",
-                    "file": "files",
-                }.get(seg_type)
-                if bucket:
-                    media[bucket].append(local_path)
-
-    if record_text:
+                media[_MEDIA_BUCKETS[seg_type]].append(local_path)
+
+    if record_text and (record_text := record_text.strip()):
         text_parts.append(record_text)
 
-    cleaned = "\n".join(line.strip() for line in text_parts if line and line.strip())
-    return cleaned if cleaned else None, media
+    # Parts are stripped as they are collected, so the common single-part message skips the join.
+    if not text_parts:
+        return None, media
+    return (text_parts[0] if len(text_parts) == 1 else "\n".join(text_parts)), media
 
 
 async def _resolve_text(
@@ -191,7 +440,7 @@ async def _resolve_text(
         text = await sentence_recognize(audio_bytes, voice_format="mp3")
         return text
     except Exception as exc:  # noqa: BLE001
-        logging.debug("ASR failed, skip message: %s", exc)
+        logger.debug("ASR failed, skip message: %s", exc)
         return None
 
 
@@ -210,63 +459,39 @@ async def _download_media(url: str, media_type: str) -> Optional[str]:
     dest = base_dir / filename
 
     try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            dest.write_bytes(resp.content)
-            return dest.resolve().as_uri()
+        resp = await shared_client().get(url, follow_redirects=True)
+        resp.raise_for_status()
+        # Videos/files can be several MB; write off the loop so the watch stream keeps draining.
+        await asyncio.to_thread(dest.write_bytes, resp.content)
+        return dest.resolve().as_uri()
     except Exception as exc:  # noqa: BLE001
-        logging.debug("Failed to download media %s: %s", url, exc)
+        logger.debug("Failed to download media %s: %s", url, exc)
         return None
 
 
 async def _fetch_voice(path: str, ws, napcat_ws: str) -> bytes:
-    if not napcat_ws:
-        return b""
-    parsed = urlparse(napcat_ws)
-    if parsed.scheme not in ("ws", "wss"):
+    if not napcat_ws or _url_scheme(napcat_ws) not in ("ws", "wss"):
         return b""
 
     payload = {"file": path, "out_format": "mp3"}
-    echo = str(uuid.uuid4())
-    request_body = {"action": "get_record", "params": payload, "echo": echo}
+    request_body = {"action": "get_record", "params": payload, "echo": f"voice-{next(_VOICE_ECHOES)}"}
 
+    # The reader task resolves this from the reply's echo; interleaved events still reach the watch loop.
     try:
-        await ws.send(json.dumps(request_body))
+        response = await ws.request(request_body, timeout=10)
     except Exception:
         return b""
 
-    response = None
-    for _ in range(10):
-        try:
-            response_raw = await asyncio.wait_for(ws.recv(), timeout=10)
-        except Exception:
-            break
-        candidate = _try_parse_json(response_raw)
-        if not candidate:
-            continue
-        if candidate.get("post_type") == "meta_event":
-            continue
-        if candidate.get("echo") and candidate.get("echo") != echo:
-            continue
-        if not candidate.get("status"):
-            continue
-        response = candidate
-        break
-
-    if response is None:
-        return b""
-
     data = response.get("data") or {}
     status = response.get("status")
     if status != "ok":
-        logging.debug("Napcat get_record full response: %s", response)
+        logger.debug("Napcat get_record full response: %s", response)
         return b""
     record_base64 = data.get("base64") if isinstance(data, dict) else None
 
     if record_base64:
         try:
-            return base64.b64decode(record_base64)
+            return b64decode(record_base64)
         except Exception:
             return b""
 
@@ -274,5 +499,7 @@ async def _fetch_voice(path: str, ws, napcat_ws: str) -> bytes:
     return b""
 
 
-def _is_passthrough_command(text: str) -> bool:
-    return text.strip() in PASSTHROUGH_COMMANDS
+@functools.lru_cache(maxsize=4)
+def _url_scheme(url: str) -> str:
+    # The watch URL is fixed per subscription; parse it once rather than on every voice message.
+    return urlparse(url).scheme
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import functools
+
+import websockets
+
+try:
+    # websockets >= 13: recv(decode=False) hands back text frames as bytes without UTF-8 validation.
+    from websockets.asyncio.client import connect
+
+    RAW_RECV = True
+except ImportError:
+    connect = websockets.connect
+    RAW_RECV = False
+
+
+def receiver(ws):
+    """recv callable for ws; the JSON decoders validate UTF-8 themselves, so skip the websockets decode."""
+    return functools.partial(ws.recv, decode=False) if RAW_RECV else ws.recv
+
+
+def recv_raw(ws):
+    """Next frame from ws, undecoded where the websockets version allows."""
+    return ws.recv(decode=False) if RAW_RECV else ws.recv()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import unittest
+
+from nap_msg import watch
+
+
+class _FakeConnection:
+    """Stands in for a websockets connection: frames are fed by the test, sends are answered by reply()."""
+
+    def __init__(self, reply=None):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent: list = []
+        self._reply = reply
+
+    async def recv(self, decode=None):
+        return await self.incoming.get()
+
+    async def send(self, message):
+        self.sent.append(message)
+        if self._reply is not None:
+            self.incoming.put_nowait(self._reply(json.loads(message)))
+
+
+def _event(index: int) -> bytes:
+    return json.dumps({"post_type": "message", "message_id": index}).encode()
+
+
+class FrameReaderTest(unittest.IsolatedAsyncioTestCase):
+    async def test_request_resolves_while_queue_is_full(self):
+        reply = lambda body: json.dumps({"status": "ok", "echo": body["echo"], "data": {}}).encode()  # noqa: E731
+        ws = _FakeConnection(reply)
+        for index in range(watch._FRAME_QUEUE_SIZE + 10):
+            ws.incoming.put_nowait(_event(index))
+        frames = watch._FrameReader(ws)
+        try:
+            # Let the reader fill its queue and pause with frames still unread on the socket.
+            for _ in range(watch._FRAME_QUEUE_SIZE + 20):
+                await asyncio.sleep(0)
+            self.assertEqual(frames._queue.qsize(), watch._FRAME_QUEUE_SIZE)
+
+            response = await frames.request({"action": "get_record", "params": {}, "echo": "voice-test"}, timeout=1)
+            self.assertEqual(response["echo"], "voice-test")
+
+            # Every event frame is still delivered, in order, after the reply was routed around them.
+            received = [json.loads(await frames.recv())["message_id"] for _ in range(watch._FRAME_QUEUE_SIZE + 10)]
+            self.assertEqual(received, list(range(watch._FRAME_QUEUE_SIZE + 10)))
+        finally:
+            frames.close()
+
+    async def test_reader_pauses_when_queue_is_full(self):
+        ws = _FakeConnection()
+        for index in range(watch._FRAME_QUEUE_SIZE + 5):
+            ws.incoming.put_nowait(_event(index))
+        frames = watch._FrameReader(ws)
+        try:
+            for _ in range(watch._FRAME_QUEUE_SIZE + 20):
+                await asyncio.sleep(0)
+            self.assertEqual(frames._queue.qsize(), watch._FRAME_QUEUE_SIZE)
+            self.assertEqual(ws.incoming.qsize(), 5)
+
+            await frames.recv()
+            for _ in range(5):
+                await asyncio.sleep(0)
+            self.assertEqual(ws.incoming.qsize(), 4)
+        finally:
+            frames.close()
+
+
+if __name__ == "__main__":
+    unittest.main()